@@ -1,230 +1,382 @@
-# http://localhost:8514/
-
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-import pymysql
-
-# --- Config ---
-st.set_page_config(page_title="Birds Monitoring Dashboard", layout="centered")
-st.title("🕊️ Bird Monitoring Dashboard 🕊️")
-
-# --- Load Data ---
-@st.cache_data(show_spinner="Loading data...")
-def load_data():
-    conn = pymysql.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="birds_db"
-    )
-    df = pd.read_sql("""
-        SELECT Plot_Name, Date, Observer, Common_Name, Scientific_Name, Distance,
-               Sex, Temperature, Humidity, Sky, Wind, Start_Time, End_Time,
-               PIF_Watchlist_Status
-        FROM bird_monitoring
-    """, conn)
-    conn.close()
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-    df["Year"] = df["Date"].dt.year
-    df["Month"] = df["Date"].dt.strftime("%b")
-    return df
-
-df = load_data()
-
-# --- Sidebar Filters ---
-with st.sidebar:
-    st.header("🔎 Filters")
-    observers = st.multiselect("Observer", sorted(df["Observer"].dropna().unique()))
-    plots = st.multiselect("Plot", sorted(df["Plot_Name"].dropna().unique()))
-    species = st.multiselect("Species", sorted(df["Common_Name"].dropna().unique()))
-    date_range = st.date_input("Date Range")
-
-# --- Filtering ---
-@st.cache_data(show_spinner=False)
-def apply_filters(df, observers, plots, species, date_range):
-    fdf = df.copy()
-    if observers:
-        fdf = fdf[fdf["Observer"].isin(observers)]
-    if plots:
-        fdf = fdf[fdf["Plot_Name"].isin(plots)]
-    if species:
-        fdf = fdf[fdf["Common_Name"].isin(species)]
-    if isinstance(date_range, list) and len(date_range) == 2:
-        fdf = fdf[
-            (fdf["Date"] >= pd.to_datetime(date_range[0])) &
-            (fdf["Date"] <= pd.to_datetime(date_range[1]))
-        ]
-    return fdf.reset_index(drop=True)
-
-filtered_df = apply_filters(df, observers, plots, species, date_range)
-
-# --- KPIs ---
-
-k1, k2, k3 = st.columns(3)
-k1.metric("Unique Species", filtered_df["Common_Name"].nunique())
-k2.metric("Total Observations", len(filtered_df))
-k3.metric("Unique Plots", filtered_df["Plot_Name"].nunique())
-
-# --- Tabs ---
-tab1, tab2, tab3, tab4 = st.tabs([
-    "📊 Visualizations",
-    "📅 Temporal Trends",
-    "📁 Raw Data",
-    "📈 Species Trends"
-])
-
-# --- TAB 1: General Visuals ---
-with tab1:
-    if filtered_df.empty:
-        st.warning("No data to visualize.")
-    else:
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.subheader("🦜 Top 10 Species Distribution")
-            pie_data = (
-                filtered_df["Common_Name"]
-                .value_counts()
-                .nlargest(10)
-                .reset_index(name="Count")
-                .rename(columns={"index": "Common_Name"})
-            )
-            fig_pie = px.pie(pie_data, names="Common_Name", values="Count")
-            st.plotly_chart(fig_pie, use_container_width=True)
-
-        with col2:
-            st.subheader("Species Observed by Observer")
-            sb_data = filtered_df.sample(n=min(1000, len(filtered_df)))
-            bar_data = (
-                sb_data.groupby(["Observer", "Common_Name"])
-                .size()
-                .reset_index(name="Count")
-            )
-            fig_stacked_bar = px.bar(bar_data,x="Observer",y="Count",color="Common_Name",barmode="stack"
-              
-            
-            )
-            st.plotly_chart(fig_stacked_bar, use_container_width=True)
-
-        st.subheader("🔵 Plot vs Species (Bubble Chart)")
-        bubble_df = (
-            filtered_df.groupby(["Plot_Name", "Common_Name"])
-            .size()
-            .reset_index(name="Count")
-            .sort_values(by="Count", ascending=False)
-            .head(100)
-        )
-        fig_bubble = px.scatter(
-            bubble_df,
-            x="Plot_Name",
-            y="Common_Name",
-            size="Count",
-            color="Common_Name",
-            title="Plot-wise Species Frequency",
-            size_max=40
-        )
-        st.plotly_chart(fig_bubble, use_container_width=True)
-
-        st.subheader("📊 Top 15 Species")
-        bar_df = (
-            filtered_df["Common_Name"]
-            .value_counts()
-            .nlargest(15)
-            .reset_index()
-        )
-        bar_df.columns = ["Common_Name", "Count"]
-        fig_bar = px.bar(bar_df, x="Common_Name", y="Count", color="Common_Name", title="Top 15 Species Observed")
-        st.plotly_chart(fig_bar, use_container_width=True)
-
-        st.subheader("🌡️ Temperature vs Species")
-        temp_df = filtered_df[["Temperature", "Common_Name"]].dropna().sample(n=min(1000, len(filtered_df)))
-        fig_temp = px.scatter(
-            temp_df,
-            x="Temperature",
-            y="Common_Name",
-            color="Common_Name",
-            title="Temperature vs Bird Observations"
-        )
-        st.plotly_chart(fig_temp, use_container_width=True)
-
-        st.subheader("💧 Humidity vs Bird Count")
-        humidity_df = (
-            filtered_df.groupby("Humidity")["Common_Name"]
-            .count()
-            .reset_index(name="Observations")
-        ).sort_values(by="Humidity")
-        fig_humidity = px.line(humidity_df, x="Humidity", y="Observations", markers=True)
-        st.plotly_chart(fig_humidity, use_container_width=True)
-
-        if "PIF_Watchlist_Status" in filtered_df.columns:
-            st.subheader("🚨 At-Risk Species (PIF Watchlist)")
-            risk_df = filtered_df[filtered_df["PIF_Watchlist_Status"] > 0]
-            if not risk_df.empty:
-                risk_summary = (
-                    filtered_df[filtered_df["PIF_Watchlist_Status"] != 0]["Common_Name"]
-                    .value_counts()
-                    .reset_index()
-                )
-                risk_summary.columns = ["Common_Name", "Count"]
-                fig_risk = px.bar(risk_summary, x="Common_Name", y="Count", title="Watchlist Species")
-                st.plotly_chart(fig_risk, use_container_width=True)
-            else:
-                st.info("No at-risk species in selected data.")
-
-# --- TAB 2: Heatmap ---
-with tab2:
-    if filtered_df.empty:
-        st.info("No data available for heatmap.")
-    else:
-        st.subheader("📆 Observation Heatmap by Month & Year")
-        heatmap_df = (
-            filtered_df.groupby(["Year", "Month"])
-            .size()
-            .reset_index(name="Observations")
-        )
-        pivot = heatmap_df.pivot(index="Month", columns="Year", values="Observations").fillna(0)
-        pivot = pivot.reindex(["Jan", "Feb", "Mar", "Apr", "May", "Jun",
-                               "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"])
-        fig_heatmap = px.imshow(
-            pivot,
-            labels=dict(x="Year", y="Month", color="Observations"),
-            title="Bird Observations Over Time"
-        )
-        st.plotly_chart(fig_heatmap, use_container_width=True)
-
-# --- TAB 3: Raw Data ---
-with tab3:
-    st.subheader("📁 Filtered Data Table")
-    st.dataframe(filtered_df.sample(n=min(len(filtered_df), 500)), use_container_width=True)
-    csv = filtered_df.to_csv(index=False).encode("utf-8")
-    st.download_button("⬇️ Download CSV", csv, "filtered_bird_data.csv", "text/csv")
-
-# --- TAB 4: Species Trends ---
-with tab4:
-    st.subheader("📈 Species-Level Observation Trends")
-    species_list = filtered_df["Common_Name"].dropna().unique()
-    selected_species = st.multiselect("Select Species", species_list, max_selections=3)
-
-    if selected_species:
-        trend_df = filtered_df[filtered_df["Common_Name"].isin(selected_species)]
-
-        st.subheader("📆 Year-wise Trends")
-        yearly = trend_df.groupby(["Year", "Common_Name"]).size().reset_index(name="Count")
-        fig_year = px.line(yearly, x="Year", y="Count", color="Common_Name", markers=True)
-        st.plotly_chart(fig_year, use_container_width=True)
-
-        st.subheader("📅 Date-wise Trends (Recent 1000)")
-        datewise = (
-            trend_df
-            .sort_values("Date")
-            .groupby(["Date", "Common_Name"])
-            .size()
-            .reset_index(name="Count")
-            .sort_values("Date")
-            .tail(1000)
-        )
-        fig_date = px.line(datewise, x="Date", y="Count", color="Common_Name", markers=True)
-        st.plotly_chart(fig_date, use_container_width=True)
-    else:
-        st.info("Select species to view trend charts.")
+# http://localhost:8514/
+
+import hashlib
+import os
+import time
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pymysql
+from dbutils.pooled_db import PooledDB
+
+# --- Config ---
+st.set_page_config(page_title="Birds Monitoring Dashboard", layout="centered")
+st.title("🕊️ Bird Monitoring Dashboard 🕊️")
+
+# --- Database ---
+DB_CONFIG = dict(
+    host="localhost",
+    user="root",
+    password="",
+    database="birds_db"
+)
+
+MONTH_ORDER = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
+               "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+FILTER_INDEXES = {
+    "idx_bm_date": "Date",
+    "idx_bm_observer": "Observer",
+    "idx_bm_plot": "Plot_Name",
+    "idx_bm_species": "Common_Name",
+}
+
+@st.cache_resource
+def get_pool():
+    return PooledDB(creator=pymysql, mincached=2, maxcached=5, **DB_CONFIG)
+
+def get_connection():
+    return get_pool().connection()
+
+@st.cache_resource
+def ensure_indexes():
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT INDEX_NAME FROM information_schema.statistics "
+                "WHERE table_schema = %s AND table_name = 'bird_monitoring'",
+                (DB_CONFIG["database"],),
+            )
+            existing = {row[0] for row in cur.fetchall()}
+            for name, column in FILTER_INDEXES.items():
+                if name not in existing:
+                    cur.execute(f"CREATE INDEX {name} ON bird_monitoring({column})")
+        conn.commit()
+    finally:
+        conn.close()
+
+# --- Load Data ---
+@st.cache_data(ttl=3600)
+def get_filter_options():
+    options = {}
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            for column in ("Observer", "Plot_Name", "Common_Name"):
+                cur.execute(
+                    f"SELECT DISTINCT {column} FROM bird_monitoring "
+                    f"WHERE {column} IS NOT NULL ORDER BY {column}"
+                )
+                options[column] = [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+    return options
+
+CACHE_DIR = "parquet_cache"
+CACHE_TTL = 3600
+
+def _cache_path(observers, plots, species, date_range):
+    key = repr((observers, plots, species, date_range)).encode("utf-8")
+    return os.path.join(CACHE_DIR, f"birds_{hashlib.md5(key).hexdigest()}.parquet")
+
+@st.cache_data(show_spinner="Loading data...")
+def fetch_filtered(observers, plots, species, date_range):
+    cache_file = _cache_path(observers, plots, species, date_range)
+    if os.path.exists(cache_file) and os.path.getmtime(cache_file) > time.time() - CACHE_TTL:
+        return pd.read_parquet(cache_file)
+    # Only the columns the dashboard actually reads; widen this list when a
+    # new chart needs another field.
+    query = """
+        SELECT Plot_Name, Date, Observer, Common_Name, Temperature, Humidity,
+               PIF_Watchlist_Status
+        FROM bird_monitoring
+    """
+    clauses, params = [], []
+    for column, values in (
+        ("Observer", observers),
+        ("Plot_Name", plots),
+        ("Common_Name", species),
+    ):
+        if values:
+            placeholders = ",".join(["%s"] * len(values))
+            clauses.append(f"{column} IN ({placeholders})")
+            params.extend(values)
+    if date_range:
+        clauses.append("Date BETWEEN %s AND %s")
+        params.extend(date_range)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY Date"
+    conn = get_connection()
+    try:
+        df = pd.read_sql(query, conn, params=params)
+    finally:
+        conn.close()
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df["Year"] = df["Date"].dt.year.astype("Int16")
+    # month 1-12 -> code 0-11; NaT months become code -1 (missing).
+    month_codes = (df["Date"].dt.month.fillna(0).astype("int8") - 1).to_numpy()
+    df["Month"] = pd.Categorical.from_codes(month_codes, categories=MONTH_ORDER,
+                                            ordered=True)
+    df["PIF_Watchlist_Status"] = pd.to_numeric(df["PIF_Watchlist_Status"],
+                                               downcast="integer")
+    df["Temperature"] = df["Temperature"].astype("float32")
+    df["Humidity"] = df["Humidity"].astype("float32")
+    for c in ["Observer", "Plot_Name", "Common_Name"]:
+        df[c] = df[c].astype("category")
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    df.to_parquet(cache_file, compression="zstd")
+    return df
+
+def top_k_counts(col, k):
+    codes = col.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(col.cat.categories))
+    k = min(k, counts.size)
+    if k == 0:
+        return pd.DataFrame({"Common_Name": [], "Count": []})
+    top = np.argpartition(-counts, k - 1)[:k]
+    top = top[np.argsort(-counts[top])]
+    return pd.DataFrame({"Common_Name": col.cat.categories[top],
+                         "Count": counts[top]})
+
+@st.cache_data(show_spinner=False)
+def build_aggregates(observers, plots, species, date_range):
+    fdf = fetch_filtered(observers, plots, species, date_range)
+    aggs = {}
+    if fdf.empty:
+        return aggs
+    aggs["pie"] = top_k_counts(fdf["Common_Name"], 10)
+    pldf = pl.from_pandas(fdf[["Observer", "Plot_Name", "Common_Name", "Humidity"]])
+    top10 = aggs["pie"]["Common_Name"].tolist()
+    aggs["stacked_bar"] = (
+        pldf.with_columns(
+            pl.when(pl.col("Common_Name").is_in(top10))
+            .then(pl.col("Common_Name").cast(pl.Utf8))
+            .otherwise(pl.lit("Other"))
+            .alias("Common_Name")
+        )
+        .group_by(["Observer", "Common_Name"])
+        .agg(pl.len().alias("Count"))
+        .to_pandas()
+    )
+    aggs["bubble"] = (
+        pldf.group_by(["Plot_Name", "Common_Name"])
+        .agg(pl.len().alias("Count"))
+        .sort("Count", descending=True)
+        .head(100)
+        .to_pandas()
+    )
+    aggs["top15"] = top_k_counts(fdf["Common_Name"], 15)
+    temp_df = fdf[["Temperature", "Common_Name"]].dropna()
+    temp_df["TempBin"] = pd.cut(temp_df["Temperature"], 30)
+    temp_agg = (
+        temp_df.groupby(["TempBin", "Common_Name"], observed=True)
+        .size()
+        .reset_index(name="Count")
+    )
+    temp_agg["TempBin"] = temp_agg["TempBin"].astype(str)
+    aggs["temperature"] = temp_agg
+    aggs["humidity"] = (
+        pldf.group_by("Humidity")
+        .agg(pl.col("Common_Name").count().alias("Observations"))
+        .sort("Humidity")
+        .to_pandas()
+    )
+    status = fdf["PIF_Watchlist_Status"].to_numpy()
+    at_risk = fdf["Common_Name"].cat.codes.to_numpy()[np.flatnonzero(status > 0)]
+    risk_counts = np.bincount(at_risk[at_risk >= 0],
+                              minlength=len(fdf["Common_Name"].cat.categories))
+    hit = np.flatnonzero(risk_counts)
+    hit = hit[np.argsort(-risk_counts[hit])]
+    aggs["risk"] = pd.DataFrame({
+        "Common_Name": fdf["Common_Name"].cat.categories[hit],
+        "Count": risk_counts[hit],
+    })
+    aggs["heatmap"] = pd.crosstab(fdf["Month"], fdf["Year"])
+    return aggs
+
+@st.cache_data(show_spinner=False)
+def species_trend_lookup(observers, plots, species, date_range):
+    fdf = fetch_filtered(observers, plots, species, date_range)
+    trends = {}
+    for name, sub in fdf.groupby("Common_Name", observed=True):
+        yearly = sub.groupby("Year").size().reset_index(name="Count")
+        yearly["Common_Name"] = name
+        datewise = sub.groupby("Date").size().reset_index(name="Count")
+        datewise["Common_Name"] = name
+        trends[name] = (yearly, datewise)
+    return trends
+
+@st.cache_resource(show_spinner=False)
+def build_figures(observers, plots, species, date_range):
+    aggs = build_aggregates(observers, plots, species, date_range)
+    figs = {}
+    if not aggs:
+        return figs
+    figs["pie"] = px.pie(aggs["pie"], names="Common_Name", values="Count")
+    figs["stacked_bar"] = px.bar(aggs["stacked_bar"], x="Observer", y="Count",
+                                 color="Common_Name", barmode="stack")
+    figs["bubble"] = px.scatter(
+        aggs["bubble"],
+        x="Plot_Name",
+        y="Common_Name",
+        size="Count",
+        color="Common_Name",
+        title="Plot-wise Species Frequency",
+        size_max=40,
+        render_mode="webgl"
+    )
+    figs["top15"] = px.bar(aggs["top15"], x="Common_Name", y="Count",
+                           color="Common_Name", title="Top 15 Species Observed")
+    figs["temperature"] = px.density_heatmap(
+        aggs["temperature"],
+        x="TempBin",
+        y="Common_Name",
+        z="Count",
+        title="Temperature vs Bird Observations"
+    )
+    figs["humidity"] = px.line(aggs["humidity"], x="Humidity", y="Observations", markers=True)
+    if not aggs["risk"].empty:
+        figs["risk"] = px.bar(aggs["risk"], x="Common_Name", y="Count",
+                              title="Watchlist Species")
+    if not aggs["heatmap"].empty:
+        figs["heatmap"] = px.imshow(
+            aggs["heatmap"],
+            labels=dict(x="Year", y="Month", color="Observations"),
+            title="Bird Observations Over Time"
+        )
+    for fig in figs.values():
+        fig.update_layout(uirevision="constant")
+    return figs
+
+@st.cache_resource(show_spinner=False)
+def build_trend_figures(observers, plots, species, date_range, selected):
+    lookup = species_trend_lookup(observers, plots, species, date_range)
+    picked = [lookup[s] for s in selected if s in lookup]
+    yearly = pd.concat([p[0] for p in picked], ignore_index=True)
+    fig_year = px.line(yearly, x="Year", y="Count", color="Common_Name", markers=True)
+    datewise = pd.concat([p[1] for p in picked], ignore_index=True)
+    dates = datewise["Date"].unique()
+    if len(dates) > 1000:
+        recent_dates = np.partition(dates, len(dates) - 1000)[-1000:]
+        datewise = datewise[datewise["Date"].isin(recent_dates)]
+    datewise = datewise.sort_values("Date")
+    fig_date = px.line(datewise, x="Date", y="Count", color="Common_Name", markers=True)
+    for fig in (fig_year, fig_date):
+        fig.update_layout(uirevision="constant")
+    return fig_year, fig_date
+
+ensure_indexes()
+
+# --- Sidebar Filters ---
+with st.sidebar:
+    st.header("🔎 Filters")
+    options = get_filter_options()
+    observers = st.multiselect("Observer", options["Observer"])
+    plots = st.multiselect("Plot", options["Plot_Name"])
+    species = st.multiselect("Species", options["Common_Name"])
+    date_range = st.date_input("Date Range")
+
+# --- Filtering (pushed down to SQL) ---
+def normalize_date_range(date_range):
+    # st.date_input yields 0, 1 or 2 dates while the user is mid-selection;
+    # only a complete (start, end) pair becomes part of the filter key.
+    if isinstance(date_range, (list, tuple)) and len(date_range) == 2:
+        return (date_range[0], date_range[1])
+    return None
+
+filter_key = (tuple(observers), tuple(plots), tuple(species),
+              normalize_date_range(date_range))
+filtered_df = fetch_filtered(*filter_key)
+figs = build_figures(*filter_key)
+
+# --- KPIs ---
+
+k1, k2, k3 = st.columns(3)
+k1.metric("Unique Species", filtered_df["Common_Name"].nunique())
+k2.metric("Total Observations", len(filtered_df))
+k3.metric("Unique Plots", filtered_df["Plot_Name"].nunique())
+
+# --- Tabs ---
+tab1, tab2, tab3, tab4 = st.tabs([
+    "📊 Visualizations",
+    "📅 Temporal Trends",
+    "📁 Raw Data",
+    "📈 Species Trends"
+])
+
+# --- TAB 1: General Visuals ---
+with tab1:
+    if filtered_df.empty:
+        st.warning("No data to visualize.")
+    else:
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.subheader("🦜 Top 10 Species Distribution")
+            st.plotly_chart(figs["pie"], use_container_width=True)
+
+        with col2:
+            st.subheader("Species Observed by Observer")
+            st.plotly_chart(figs["stacked_bar"], use_container_width=True)
+
+        st.subheader("🔵 Plot vs Species (Bubble Chart)")
+        st.plotly_chart(figs["bubble"], use_container_width=True)
+
+        st.subheader("📊 Top 15 Species")
+        st.plotly_chart(figs["top15"], use_container_width=True)
+
+        st.subheader("🌡️ Temperature vs Species")
+        st.plotly_chart(figs["temperature"], use_container_width=True)
+
+        st.subheader("💧 Humidity vs Bird Count")
+        st.plotly_chart(figs["humidity"], use_container_width=True)
+
+        if "PIF_Watchlist_Status" in filtered_df.columns:
+            st.subheader("🚨 At-Risk Species (PIF Watchlist)")
+            if "risk" in figs:
+                st.plotly_chart(figs["risk"], use_container_width=True)
+            else:
+                st.info("No at-risk species in selected data.")
+
+# --- TAB 2: Heatmap ---
+with tab2:
+    if filtered_df.empty:
+        st.info("No data available for heatmap.")
+    else:
+        st.subheader("📆 Observation Heatmap by Month & Year")
+        st.plotly_chart(figs["heatmap"], use_container_width=True)
+
+# --- TAB 3: Raw Data ---
+with tab3:
+    st.subheader("📁 Filtered Data Table")
+    st.dataframe(filtered_df.sample(n=min(len(filtered_df), 500)), use_container_width=True)
+    if st.button("Prepare download"):
+        sink = pa.BufferOutputStream()
+        with pa.CompressedOutputStream(sink, "gzip") as gz:
+            pa_csv.write_csv(pa.Table.from_pandas(filtered_df, preserve_index=False), gz)
+        st.download_button("⬇️ Download CSV", sink.getvalue().to_pybytes(),
+                           "filtered_bird_data.csv.gz", "application/gzip")
+
+# --- TAB 4: Species Trends ---
+with tab4:
+    st.subheader("📈 Species-Level Observation Trends")
+    species_list = filtered_df["Common_Name"].cat.categories
+    selected_species = st.multiselect("Select Species", species_list, max_selections=3)
+
+    if selected_species:
+        fig_year, fig_date = build_trend_figures(*filter_key, tuple(selected_species))
+
+        st.subheader("📆 Year-wise Trends")
+        st.plotly_chart(fig_year, use_container_width=True)
+
+        st.subheader("📅 Date-wise Trends (Recent 1000)")
+        st.plotly_chart(fig_date, use_container_width=True)
+    else:
+        st.info("Select species to view trend charts.")